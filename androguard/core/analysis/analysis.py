@@ -136,7 +136,8 @@ class DEXBasicBlock:
 
         :return: androguard.core.bytecodes.dvm.Instruction
         """
-        return list(self.get_instructions())[-1]
+        # Do not materialize the whole generator just to get the last item
+        return collections.deque(self.get_instructions(), maxlen=1)[-1]
 
     def get_next(self):
         """
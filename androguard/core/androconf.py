@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+import shutil
 import tempfile
 from colorama import init, Fore
 from loguru import logger
@@ -161,12 +162,9 @@ def rrmdir(directory):
 
     :param directory: directory to remove
     """
-    for root, dirs, files in os.walk(directory, topdown=False):
-        for name in files:
-            os.remove(os.path.join(root, name))
-        for name in dirs:
-            os.rmdir(os.path.join(root, name))
-    os.rmdir(directory)
+    # shutil.rmtree walks via os.scandir and reuses the dirent information,
+    # where the old os.walk implementation stat()ed every entry again
+    shutil.rmtree(directory)
 
 
 def make_color_tuple(color):
@@ -13,9 +13,13 @@ md5 = lambda bs: hashlib.md5(bs).hexdigest()
 from loguru import logger
 
 class Message:
-    pass
+    __slots__ = ()
 
 class MessageEvent(Message):
+    # One instance per traced call, so keep the payload slotted instead of
+    # paying for a per-instance __dict__
+    __slots__ = ('index', 'from_method', 'to_method', 'params', 'ret_value')
+
     def __init__(self, index, function_callee, function_call, params, ret_value):
         self.index = index
         self.from_method = function_call
@@ -24,6 +28,8 @@ class MessageEvent(Message):
         self.ret_value = ret_value
 
 class MessageSystem(Message):
+    __slots__ = ('index', 'from_method', 'to_method', 'params', 'ret_value')
+
     def __init__(self, index, function_callee, function_call, params, information):
         self.index = index
         self.from_method = function_call
@@ -45,6 +51,9 @@ class Pentest:
         self.ag_scripts = ['androguard/pentest/internal/utils.js']
         self.idx = 0
         self.message_queue = queue.Queue()
+        # Signalled once the frida session goes away, so callers can block
+        # on it instead of polling is_detached()
+        self.detach_event = threading.Event()
 
     def is_detached(self):
         return self.detached
@@ -113,6 +122,10 @@ class Pentest:
         self.device.on('lost', self.on_spawned)
         self.device.enable_spawn_gating()
         self.event = threading.Event()
+        # A reused Pentest may still carry the detach state of an earlier
+        # trace, reset it for the new session
+        self.detached = False
+        self.detach_event.clear()
         logger.info('Enabled spawn gating')
 
         try:
@@ -226,6 +239,7 @@ class Pentest:
     def on_detached(self, reason):
         logger.info("Session is detached due to: {}".format(reason))
         self.detached = True
+        self.detach_event.set()
     
     def on_spawned(self, spawn):
         #logger.info('on_spawned: {}'.format(spawn))
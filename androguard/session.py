@@ -77,9 +77,9 @@ class Session:
         self.added_files = []
 
         # Stores Analysis Objects
-        # needs to be ordered to return the outermost element when searching for
-        # classes
-        self.analyzed_vms = collections.OrderedDict()
+        # needs to be ordered to return the outermost element when searching
+        # for classes; plain dicts keep insertion order since Python 3.7
+        self.analyzed_vms = dict()
 
         # Dict of digest and DEX/DalvikOdexFormat
         # Actually not needed, as we have Analysis objects which store the DEX
@@ -349,7 +349,10 @@ def apkid(apks):
     results = dict()
     for apk in apks:
         results[apk] = get_apkid(apk)
-    print(json.dumps(results, indent=2))
+    # Serialize straight to stdout instead of building the whole
+    # document in memory first
+    json.dump(results, sys.stdout, indent=2)
+    print()
 
 
 @entry_point.command()
@@ -1,8 +1,11 @@
 # core modules
+import hashlib
 import os
 import re
 import shutil
 import sys
+import threading
+from functools import lru_cache
 
 # 3rd party modules
 from lxml import etree
@@ -14,34 +17,55 @@ from pygments.formatters.terminal import TerminalFormatter
 # internal modules
 from androguard.core import androconf
 from androguard.core import apk
-from androguard.core.axml import AXMLPrinter
+from androguard.core.axml import ARSCParser, AXMLPrinter
 from androguard.util import readFile
-from androguard.ui import DynamicUI
+
+# Shared by androaxml_main and androarsc_main: looking up the lexer walks
+# the pygments registry, so do it once instead of per invocation
+_XML_LEXER = get_lexer_by_name("xml")
+_TERMINAL_FORMATTER = TerminalFormatter()
+
+# Explicit dispatch table for androarsc_main instead of assembling
+# "get_<type>_resources" attribute names at runtime. Only decoders taking
+# (package, locale) belong here.
+_ARSC_RESOURCE_DECODERS = {
+    "public": ARSCParser.get_public_resources,
+    "string": ARSCParser.get_string_resources,
+    "id": ARSCParser.get_id_resources,
+    "bool": ARSCParser.get_bool_resources,
+    "integer": ARSCParser.get_integer_resources,
+    "color": ARSCParser.get_color_resources,
+    "dimen": ARSCParser.get_dimen_resources,
+}
+
 
 def androaxml_main(inp, outp=None, resource=None):
     ret_type = androconf.is_android(inp)
     if ret_type == "APK":
-        a = apk.APK(inp)
+        # We only need a single binary XML file out of the zip, so skip the
+        # manifest/permission analysis and the resource table entirely
+        a = apk.APK(inp, skip_analysis=True)
         if resource:
-            if resource not in a.files:
+            if resource not in a.get_files():
                 logger.error("The APK does not contain a file called '{}'".format(resource), file=sys.stderr)
                 sys.exit(1)
 
             axml = AXMLPrinter(a.get_file(resource)).get_xml_obj()
         else:
-            axml = a.get_android_manifest_xml()
+            axml = AXMLPrinter(a.get_file("AndroidManifest.xml")).get_xml_obj()
     elif ".xml" in inp:
         axml = AXMLPrinter(readFile(inp)).get_xml_obj()
     else:
         logger.error("Unknown file type")
         sys.exit(1)
 
-    buff = etree.tostring(axml, pretty_print=True, encoding="utf-8")
     if outp:
-        with open(outp, "wb") as fd:
-            fd.write(buff)
+        # Let libxml2 serialize straight into the file instead of building
+        # the whole document as an intermediate bytes object
+        axml.getroottree().write(outp, pretty_print=True, encoding="utf-8")
     else:
-        sys.stdout.write(highlight(buff.decode("UTF-8"), get_lexer_by_name("xml"), TerminalFormatter()))
+        buff = etree.tostring(axml, pretty_print=True, encoding="utf-8")
+        sys.stdout.write(highlight(buff.decode("UTF-8"), _XML_LEXER, _TERMINAL_FORMATTER))
 
 
 def androarsc_main(arscobj, outp=None, package=None, typ=None, locale=None):
@@ -53,23 +77,22 @@ def androarsc_main(arscobj, outp=None, package=None, typ=None, locale=None):
     # TODO: be able to recreate the structure of files when developing, eg a
     # res folder with all the XML files
 
-    if not hasattr(arscobj, "get_{}_resources".format(ttype)):
+    decoder = _ARSC_RESOURCE_DECODERS.get(ttype)
+    if decoder is None:
         print("No decoder found for type: '{}'! Please open a bug report."
               .format(ttype),
               file=sys.stderr)
         sys.exit(1)
 
-    x = getattr(arscobj, "get_" + ttype + "_resources")(package, locale)
-
-    buff = etree.tostring(etree.fromstring(x),
-                          pretty_print=True,
-                          encoding="UTF-8")
+    x = decoder(arscobj, package, locale)
 
+    root = etree.fromstring(x)
     if outp:
-        with open(outp, "wb") as fd:
-            fd.write(buff)
+        # Serialize into the file directly, see androaxml_main
+        root.getroottree().write(outp, pretty_print=True, encoding="UTF-8")
     else:
-        sys.stdout.write(highlight(buff.decode("UTF-8"), get_lexer_by_name("xml"), TerminalFormatter()))
+        buff = etree.tostring(root, pretty_print=True, encoding="UTF-8")
+        sys.stdout.write(highlight(buff.decode("UTF-8"), _XML_LEXER, _TERMINAL_FORMATTER))
 
 
 def export_apps_to_format(filename,
@@ -93,11 +116,10 @@ def export_apps_to_format(filename,
         androconf.rrmdir(output)
         os.makedirs(output)
 
-    methods_filter_expr = None
-    if methods_filter:
-        methods_filter_expr = re.compile(methods_filter)
+    # Bind the compiled matcher once, the loop below runs it per method
+    methods_match = re.compile(methods_filter).search if methods_filter else None
 
-    dump_classes = []
+    dump_classes = set()
     for _, vm, vmx in s.get_objects_dex():
         print("Decompilation ...", end=' ')
         sys.stdout.flush()
@@ -134,20 +156,20 @@ def export_apps_to_format(filename,
             print("End")
 
         for method in vm.get_methods():
-            if methods_filter_expr:
-                msig = "{}{}{}".format(method.get_class_name(), method.get_name(),
-                                   method.get_descriptor())
-                if not methods_filter_expr.search(msig):
-                    continue
+            # Resolve the accessors once, they are reused all over the loop body
+            class_name = str(method.get_class_name())
+            method_name = method.get_name()
+            descriptor = method.get_descriptor()
+
+            if methods_match and not methods_match("{}{}{}".format(class_name, method_name, descriptor)):
+                continue
 
             # Current Folder to write to
-            filename_class = valid_class_name(str(method.get_class_name()))
+            filename_class = valid_class_name(class_name)
             filename_class = os.path.join(output, filename_class)
             create_directory(filename_class)
 
-            print("Dump {} {} {} ...".format(method.get_class_name(),
-                                         method.get_name(),
-                                         method.get_descriptor()), end=' ')
+            print("Dump {} {} {} ...".format(class_name, method_name, descriptor), end=' ')
 
             filename = clean_file_name(os.path.join(filename_class, method.get_short_string()))
 
@@ -158,7 +180,7 @@ def export_apps_to_format(filename,
                 method2format(filename + "." + form, form, None, buff)
 
             # Write the Java file for the whole class
-            if str(method.get_class_name()) not in dump_classes:
+            if class_name not in dump_classes:
                 print("source codes ...", end=' ')
                 current_class = vm.get_class(method.get_class_name())
                 current_filename_class = valid_class_name(str(current_class.get_name()))
@@ -166,7 +188,7 @@ def export_apps_to_format(filename,
                 current_filename_class = os.path.join(output, current_filename_class + ".java")
                 with open(current_filename_class, "w") as fd:
                     fd.write(current_class.get_source())
-                dump_classes.append(method.get_class_name())
+                dump_classes.add(class_name)
 
             # Write SMALI like code
             print("bytecodes ...", end=' ')
@@ -289,41 +311,54 @@ def androlyze_main(session, filename):
     ipshell()
 
 
+@lru_cache(maxsize=1024)
+def _cert_digest(algorithm, cert):
+    """
+    Return the hex digest of a certificate.
+
+    Cached, so a signing certificate shared by several APKs (common for app
+    families with the same signing key) is only hashed once per algorithm.
+    """
+    return hashlib.new(algorithm, cert).hexdigest()
+
+
 def androsign_main(args_apk, args_hash, args_all, show):
     from androguard.core.apk import APK
     from androguard.util import get_certificate_name_string
 
-    import hashlib
     import binascii
     import traceback
+    from itertools import chain
     from colorama import Fore, Style
     from asn1crypto import x509, keys
 
     # Keep the list of hash functions in sync with cli/entry_points.py:sign
-    hashfunctions = dict(md5=hashlib.md5,
-                         sha1=hashlib.sha1,
-                         sha256=hashlib.sha256,
-                         sha512=hashlib.sha512,
-                         )
+    hashfunctions = ('md5', 'sha1', 'sha256', 'sha512')
 
     if args_hash.lower() not in hashfunctions:
         print("Hash function {} not supported!"
               .format(args_hash.lower()), file=sys.stderr)
         print("Use one of {}"
-              .format(", ".join(hashfunctions.keys())), file=sys.stderr)
+              .format(", ".join(hashfunctions)), file=sys.stderr)
         sys.exit(1)
 
     for path in args_apk:
         try:
             a = APK(path)
 
+            # get_signature_names() scans the whole zip directory, so resolve
+            # it once and reuse it for the v1 check and the certificate list
+            signature_names = a.get_signature_names()
+
             print("{}, package: '{}'".format(os.path.basename(path), a.get_package()))
-            print("Is signed v1: {}".format(a.is_signed_v1()))
+            print("Is signed v1: {}".format(len(signature_names) > 0))
             print("Is signed v2: {}".format(a.is_signed_v2()))
             print("Is signed v3: {}".format(a.is_signed_v3()))
 
-            certs = set(a.get_certificates_der_v3() + a.get_certificates_der_v2() + [a.get_certificate_der(x) for x in a.get_signature_names()])
-            pkeys = set(a.get_public_keys_der_v3() + a.get_public_keys_der_v2())
+            certs = set(chain(a.get_certificates_der_v3(),
+                              a.get_certificates_der_v2(),
+                              (a.get_certificate_der(x) for x in signature_names)))
+            pkeys = set(chain(a.get_public_keys_der_v3(), a.get_public_keys_der_v2()))
 
             if len(certs) > 0:
                 print("Found {} unique certificates".format(len(certs)))
@@ -340,10 +375,10 @@ def androsign_main(args_apk, args_hash, args_all, show):
                     print("Valid not after:", x509_cert['tbs_certificate']['validity']['not_after'].native)
 
                 if not args_all:
-                    print("{} {}".format(args_hash.lower(), hashfunctions[args_hash.lower()](cert).hexdigest()))
+                    print("{} {}".format(args_hash.lower(), _cert_digest(args_hash.lower(), cert)))
                 else:
-                    for k, v in hashfunctions.items():
-                        print("{} {}".format(k, v(cert).hexdigest()))
+                    for k in hashfunctions:
+                        print("{} {}".format(k, _cert_digest(k, cert)))
                 print()
 
             if len(certs) > 0:
@@ -376,7 +411,7 @@ def androdis_main(offset, size, dex_file):
 
     with open(dex_file, "rb") as fp:
         buf = fp.read()
-    
+
     d = DEX(buf)
 
     if size == 0 and offset == 0:
@@ -403,8 +438,32 @@ def androdis_main(offset, size, dex_file):
 
                 idx += i.get_length()
 
-def androtrace_main(apk_file, list_modules, live=False, enable_ui=False):
+# Connected Pentest shared by androtrace_main and androdump_main: frida
+# device enumeration and attaching take seconds, so keep the connection
+# alive across invocations instead of redoing it per call
+_connected_pentest = None
+_pentest_lock = threading.Lock()
+
+
+def _get_pentest():
+    """
+    Return a :class:`Pentest` connected to the default USB device, creating
+    and connecting it only on the first call.
+    """
+    global _connected_pentest
+
     from androguard.pentest import Pentest
+
+    with _pentest_lock:
+        if _connected_pentest is None:
+            p = Pentest()
+            p.print_devices()
+            p.connect_default_usb()
+            _connected_pentest = p
+        return _connected_pentest
+
+
+def androtrace_main(apk_file, list_modules, live=False, enable_ui=False):
     from androguard.session import Session
 
     s = Session()
@@ -416,9 +475,7 @@ def androtrace_main(apk_file, list_modules, live=False, enable_ui=False):
         h = s.add(apk_file, raw)
         logger.info("Added file to session: SHA256::{}".format(h))
 
-    p = Pentest()
-    p.print_devices()
-    p.connect_default_usb()
+    p = _get_pentest()
     p.start_trace(apk_file, s, list_modules, live=live)
 
     if enable_ui:
@@ -427,6 +484,8 @@ def androtrace_main(apk_file, list_modules, live=False, enable_ui=False):
         from prompt_toolkit.application import get_app
         import time
 
+        from androguard.ui import DynamicUI
+
         time.sleep(1)
         
         ui = DynamicUI(p.message_queue)
@@ -441,19 +500,26 @@ def androtrace_main(apk_file, list_modules, live=False, enable_ui=False):
 
         ui.run()
     else:
+        def wait_for_exit():
+            try:
+                while input("Type 'e' to exit:") != 'e':
+                    pass
+            except EOFError:
+                pass
+            p.detach_event.set()
+
         logger.warning("Type 'e' to exit the strace ")
-        s = ""
-        while (s!='e') and (not p.is_detached()):
-            s = input("Type 'e' to exit:")    
+        # Read user input on a side thread and block here until either the
+        # user asks to leave or the traced process detaches; the old loop
+        # only noticed a detach after the next keystroke
+        threading.Thread(target=wait_for_exit, daemon=True).start()
+        p.detach_event.wait()
 
 
 def androdump_main(package_name, list_modules):
-    from androguard.pentest import Pentest
     from androguard.session import Session
 
     s = Session()
 
-    p = Pentest()
-    p.print_devices()
-    p.connect_default_usb()
+    p = _get_pentest()
     p.start_trace(package_name, s, list_modules, live=True, dump=True)